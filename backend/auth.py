@@ -3,15 +3,24 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-import models, schemas, database
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas, database
 
 SECRET_KEY = "YOUR_SECRET_KEY_HERE_CHANGE_THIS_IN_PRODUCTION"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# Argon2id with OWASP-recommended parameters; pbkdf2_sha256 is kept so existing hashes still verify
+pwd_context = CryptContext(
+    schemes=["argon2", "pbkdf2_sha256"],
+    deprecated="auto",
+    argon2__rounds=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 def verify_password(plain_password, hashed_password):
@@ -30,16 +39,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(db: Session = Depends(database.get_db)):
+# DEMO MODE: id of the single demo user, cached after the first lookup
+_demo_user_id: Optional[int] = None
+
+async def get_current_user(db: AsyncSession = Depends(database.get_db)):
     # DEMO MODE: Always return the first user, or create one if none exists
-    user = db.query(models.User).first()
+    global _demo_user_id
+    if _demo_user_id is not None:
+        # Primary key lookup, served from the session identity map when possible
+        user = await db.get(models.User, _demo_user_id)
+        if user:
+            return user
+
+    user = (await db.execute(select(models.User).limit(1))).scalars().first()
     if not user:
-        # Create a demo user if DB is empty
-        hashed_password = get_password_hash("demo")
+        # Create a demo user if DB is empty (hashing is CPU-bound, keep it off the event loop)
+        hashed_password = await run_in_threadpool(get_password_hash, "demo")
         user = models.User(email="demo@wealthmap.com", hashed_password=hashed_password)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
+    _demo_user_id = user.id
     return user
 
     # Original Auth Logic (Commented out for Demo Mode)
@@ -60,3 +80,10 @@ async def get_current_user(db: Session = Depends(database.get_db)):
     # if user is None:
     #     raise credentials_exception
     # return user
+
+async def get_current_user_id(db: AsyncSession = Depends(database.get_db)) -> int:
+    # For endpoints that only need the id: skips loading the User row once it is known
+    if _demo_user_id is not None:
+        return _demo_user_id
+    user = await get_current_user(db)
+    return user.id
@@ -1,7 +1,12 @@
+import threading
+import warnings
 import yfinance as yf
 import numpy as np
 import pandas as pd
-from typing import List, Dict
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple
 
 # Static Asset Class Data
 # Annualized Return and Volatility
@@ -14,118 +19,272 @@ ASSET_CLASSES = {
     "real_estate": {"name": "Real Estate", "mean_return": 0.08, "volatility": 0.10}, # Proxy using REITs or similar
 }
 
+_RNG = np.random.default_rng()
+
+# Quotes are refreshed at most every 5 minutes; the date in the key forces a refresh at day rollover
+_PRICE_CACHE = TTLCache(maxsize=512, ttl=300)
+_FX_CACHE = TTLCache(maxsize=1, ttl=300)
+_PRICE_LOCK = threading.Lock()
+_FX_LOCK = threading.Lock()
+
+def _utc_today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+@cached(cache=_FX_CACHE, key=lambda: hashkey(_utc_today()), lock=_FX_LOCK)
+def _get_usd_twd_rate() -> float:
+    """
+    Fetches the latest USD to TWD exchange rate, shared by all USD tickers.
+    Raises LookupError (which is not cached) if no data is available.
+    """
+    rate_history = yf.Ticker("TWD=X").history(period="1d")
+    if rate_history.empty:
+        raise LookupError("No exchange rate data for TWD=X")
+    return rate_history['Close'].iloc[-1]
+
+@cached(cache=_PRICE_CACHE, key=lambda ticker: hashkey(ticker, _utc_today()), lock=_PRICE_LOCK)
+def _get_cached_stock_price_and_rate(ticker: str):
+    history = yf.Ticker(ticker).history(period="1d")
+    if history.empty:
+        raise LookupError(f"No price data for {ticker}")
+
+    price = history['Close'].iloc[-1]
+
+    # Determine exchange rate
+    rate = 1.0
+    if not ticker.endswith(".TW") and not ticker.endswith(".TWO"):
+        # Assume USD for non-TW stocks for simplicity, fetch USD/TWD rate
+        # In a real app, we should detect currency more robustly
+        rate = _get_usd_twd_rate()
+
+    return price, rate
+
 def get_stock_price_and_rate(ticker: str):
     """
     Fetches the latest stock price and exchange rate (USD to TWD).
     If the ticker is a Taiwan stock (ends with .TW), rate is 1.
+    Successful lookups are cached per ticker for a few minutes; failures are not.
     """
     try:
-        stock = yf.Ticker(ticker)
-        history = stock.history(period="1d")
-        if history.empty:
-            return 0.0, 1.0
-        
-        price = history['Close'].iloc[-1]
-        
-        # Determine exchange rate
-        rate = 1.0
-        if not ticker.endswith(".TW") and not ticker.endswith(".TWO"):
-            # Assume USD for non-TW stocks for simplicity, fetch USD/TWD rate
-            # In a real app, we should detect currency more robustly
-            usd_twd = yf.Ticker("TWD=X")
-            rate_history = usd_twd.history(period="1d")
-            if not rate_history.empty:
-                rate = rate_history['Close'].iloc[-1]
-        
-        return price, rate
+        return _get_cached_stock_price_and_rate(ticker)
+    except LookupError:
+        return 0.0, 1.0
     except Exception as e:
         print(f"Error fetching data for {ticker}: {e}")
         return 0.0, 1.0
 
+def get_prices_and_rate(tickers: List[str]) -> Dict[str, Tuple[float, float]]:
+    """
+    Fetches the latest price and exchange rate for several tickers in a single request.
+    Returns {ticker: (price, rate)}, with (0.0, 1.0) for tickers without data.
+    Results are written to the same cache used by get_stock_price_and_rate.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if len(tickers) <= 1:
+        return {ticker: get_stock_price_and_rate(ticker) for ticker in tickers}
+
+    try:
+        # Use auto_adjust=True to match the backtest; one round-trip for all tickers plus the FX rate
+        closes = yf.download(tickers + ["TWD=X"], period="1d", auto_adjust=True, progress=False, threads=True)['Close']
+        latest = closes.ffill().iloc[-1]
+    except Exception as e:
+        print(f"Error fetching data for {tickers}: {e}")
+        return {ticker: (0.0, 1.0) for ticker in tickers}
+
+    usd_twd = latest.get("TWD=X")
+    if usd_twd is not None and not pd.isna(usd_twd):
+        with _FX_LOCK:
+            _FX_CACHE[hashkey(_utc_today())] = usd_twd
+
+    results = {}
+    for ticker in tickers:
+        price = latest.get(ticker)
+        if price is None or pd.isna(price):
+            results[ticker] = (0.0, 1.0)
+            continue
+
+        rate = 1.0
+        if not ticker.endswith(".TW") and not ticker.endswith(".TWO"):
+            if usd_twd is None or pd.isna(usd_twd):
+                results[ticker] = (0.0, 1.0)
+                continue
+            rate = usd_twd
+
+        results[ticker] = (price, rate)
+        with _PRICE_LOCK:
+            _PRICE_CACHE[hashkey(ticker, _utc_today())] = (price, rate)
+
+    return results
+
+# Canonical ordering of asset classes; class codes index into this tuple
+_CLASS_ORDER = tuple(ASSET_CLASSES)
+_CLASS_CODE = {key: code for code, key in enumerate(_CLASS_ORDER)}
+_MEAN_R = np.array([ASSET_CLASSES[key]["mean_return"] for key in _CLASS_ORDER])
+_VOL = np.array([ASSET_CLASSES[key]["volatility"] for key in _CLASS_ORDER])
+
+def _classify(assets: List[any]):
+    """
+    Maps each asset to an asset class code (index into _CLASS_ORDER).
+    Returns (classes, values) as arrays aligned with `assets`.
+    """
+    categories = np.array([asset.category or "" for asset in assets], dtype=str)
+    names = np.char.lower(np.array([asset.name or "" for asset in assets], dtype=str))
+    tickers = np.array([asset.ticker or "" for asset in assets], dtype=str)
+    values = np.array([asset.value for asset in assets], dtype=float)
+
+    is_stock = categories == "Stock/Fund"
+    is_tw = np.char.endswith(tickers, ".TW") | np.char.endswith(tickers, ".TWO")
+    is_gold = (np.char.find(names, "gold") >= 0) | (np.char.find(names, "黃金") >= 0)
+
+    # Conditions are evaluated in order, first match wins
+    classes = np.select(
+        [
+            categories == "Cash/Bank Deposit",
+            is_stock & is_tw,
+            is_stock,
+            (categories == "Bond") | (categories == "Insurance"),
+            categories == "Real Estate",
+            is_gold,
+        ],
+        [
+            _CLASS_CODE["cash"],
+            _CLASS_CODE["tw_stock"],
+            _CLASS_CODE["us_stock"],
+            _CLASS_CODE["bond"],
+            _CLASS_CODE["real_estate"],
+            _CLASS_CODE["gold"],
+        ],
+        default=_CLASS_CODE["us_stock"] # Default 'Other' to US Stock for growth potential
+    )
+    return classes, values
+
+def _class_weights(classes: np.ndarray, values: np.ndarray, total_value: float) -> np.ndarray:
+    return np.bincount(classes, weights=values, minlength=len(_CLASS_ORDER)) / total_value
+
 def calculate_portfolio_metrics(assets: List[any], metrics_overrides: Dict[str, Dict[str, float]] = None):
     """
     Calculates the weighted average return and volatility of the user's portfolio.
     Maps user assets to ASSET_CLASSES.
     If metrics_overrides is provided (from historical backtest), use those values instead of defaults.
     """
-    total_value = sum(asset.value for asset in assets)
+    classes, values = _classify(assets)
+    total_value = values.sum()
     if total_value == 0:
         # Default to Cash if no assets
         if metrics_overrides and "cash" in metrics_overrides:
             return metrics_overrides["cash"]["return"], metrics_overrides["cash"]["volatility"], {}
         return ASSET_CLASSES["cash"]["mean_return"], ASSET_CLASSES["cash"]["volatility"], {}
 
-    weighted_return = 0.0
-    weighted_volatility = 0.0 
+    weights = _class_weights(classes, values, total_value)
     
-    breakdown = {}
+    # Use overridden metrics if available
+    mean_returns = _MEAN_R.copy()
+    volatilities = _VOL.copy()
+    if metrics_overrides:
+        for key, metrics in metrics_overrides.items():
+            if key in _CLASS_CODE:
+                mean_returns[_CLASS_CODE[key]] = metrics["return"]
+                volatilities[_CLASS_CODE[key]] = metrics["volatility"]
+
+    # Only classes the user holds contribute, so a NaN override for any other class (e.g. a ticker
+    # with no history) cannot leak into the totals through 0 * NaN
+    held = np.bincount(classes, minlength=len(_CLASS_ORDER)) > 0
+    contributions = np.zeros(len(_CLASS_ORDER))
+    contributions[held] = weights[held] * mean_returns[held]
+    weighted_return = float(contributions.sum())
+    weighted_volatility = float(weights[held] @ volatilities[held])
     
-    # Initialize breakdown with defaults or overrides
-    for key in ASSET_CLASSES:
-        mean_return = ASSET_CLASSES[key]["mean_return"]
-        volatility = ASSET_CLASSES[key]["volatility"]
-        
-        if metrics_overrides and key in metrics_overrides:
-            mean_return = metrics_overrides[key]["return"]
-            volatility = metrics_overrides[key]["volatility"]
-            
-        breakdown[key] = {
+    breakdown = {
+        key: {
             "name": ASSET_CLASSES[key]["name"],
-            "weight": 0.0,
-            "mean_return": mean_return,
-            "volatility": volatility,
-            "contribution_return": 0.0
+            "weight": float(weights[code]),
+            "mean_return": float(mean_returns[code]),
+            "volatility": float(volatilities[code]),
+            "contribution_return": float(contributions[code])
         }
-
-    for asset in assets:
-        weight = asset.value / total_value
-        
-        # Map asset to class
-        asset_class = "cash" # Default
-        category = asset.category
-        name = asset.name.lower()
-        ticker = asset.ticker
-        
-        if category == "Cash/Bank Deposit":
-            asset_class = "cash"
-        elif category == "Stock/Fund":
-            if ticker and (ticker.endswith(".TW") or ticker.endswith(".TWO")):
-                asset_class = "tw_stock"
-            else:
-                asset_class = "us_stock"
-        elif category == "Bond" or category == "Insurance":
-            asset_class = "bond"
-        elif category == "Real Estate":
-            asset_class = "real_estate"
-        elif "gold" in name or "黃金" in name:
-            asset_class = "gold"
-        else:
-            asset_class = "us_stock" # Default 'Other' to US Stock for growth potential
-            
-        # Use overridden metrics if available
-        mean_return = ASSET_CLASSES[asset_class]["mean_return"]
-        volatility = ASSET_CLASSES[asset_class]["volatility"]
-        
-        if metrics_overrides and asset_class in metrics_overrides:
-            mean_return = metrics_overrides[asset_class]["return"]
-            volatility = metrics_overrides[asset_class]["volatility"]
-            
-        weighted_return += weight * mean_return
-        weighted_volatility += weight * volatility
-        
-        breakdown[asset_class]["weight"] += weight
-        breakdown[asset_class]["contribution_return"] += weight * mean_return
+        for code, key in enumerate(_CLASS_ORDER)
+    }
         
     return weighted_return, weighted_volatility, breakdown
 
-def run_monte_carlo_simulation(
+def _simulate_paths(
+    rng: np.random.Generator, initial: float, contribution: float, mean: float, std: float, steps: int, iterations: int
+):
+    """
+    Simulates `iterations` paths of P_t = P_{t-1} * (1 + r_t) + contribution over `steps` steps.
+    Paths are stored as float32, which is plenty for portfolio values and halves memory traffic.
+    Uses the closed-form solution of the recurrence instead of stepping through time:
+    P_t = g_t * (P_0 + c * sum_{k<=t} 1/g_k), where g_t = prod_{k<=t} (1 + r_k).
+    With c == 0 this reduces to a single cumulative product.
+    """
+    # Work in two preallocated buffers: `growth` and the output array itself
+    growth = np.empty((iterations, steps), dtype=np.float32)
+    rng.standard_normal(dtype=np.float32, out=growth)
+    growth *= std
+    growth += 1.0 + mean
+    np.cumprod(growth, axis=1, out=growth)
+
+    sims = np.empty((iterations, steps + 1), dtype=np.float32)
+    sims[:, 0] = initial
+    paths = sims[:, 1:]
+    if contribution == 0:
+        # Without contributions the path is just P_0 * g_t
+        np.multiply(growth, initial, out=paths)
+        return sims
+
+    np.divide(1.0, growth, out=paths)
+    np.cumsum(paths, axis=1, out=paths)
+    paths *= contribution
+    paths += initial
+    paths *= growth
+    return sims
+
+def _scenario_indices(final_values: np.ndarray):
+    """
+    Returns the path indices ranked at P5, P50 and P95 of the final values.
+    A single partial partition selects all three ranks in O(N) instead of sorting per percentile.
+    """
+    n = len(final_values)
+    kth = [min(int(q / 100 * n), n - 1) for q in (5, 50, 95)]
+    order = np.argpartition(final_values, kth)
+    return order[kth[0]], order[kth[1]], order[kth[2]]
+
+def _format_scenario_paths(sims: np.ndarray, idx_best, idx_worst, idx_median, idx_volatile):
+    # Convert rows to Python floats (float64) for the JSON response
+    best, worst, median, volatile = (
+        sims[idx].astype(np.float64).tolist() for idx in (idx_best, idx_worst, idx_median, idx_volatile)
+    )
+    return [
+        {"step": i, "best": best[i], "worst": worst[i], "median": median[i], "volatile": volatile[i]}
+        for i in range(sims.shape[1])
+    ]
+
+def _select_scenario_paths(sims: np.ndarray):
+    # Find indices for specific scenarios
+    final_values = sims[:, -1]
+    
+    # 1-3. Worst (P5), Median (P50) and Best (P95) Cases
+    idx_worst, idx_median, idx_best = _scenario_indices(final_values)
+    
+    # 4. High Volatility (Max Std Dev of returns)
+    # Calculate returns for each path: (Pt - Pt-1) / Pt-1
+    # This is approximate, but good enough for visual selection
+    # Or simply use the path with highest standard deviation of prices if returns are constant mean
+    # Better: Calculate std dev of daily/monthly returns for each path
+    returns = np.diff(sims, axis=1) / sims[:, :-1]
+    path_volatilities = np.std(returns, axis=1)
+    idx_volatile = np.argmax(path_volatilities)
+
+    # Format for frontend
+    return _format_scenario_paths(sims, idx_best, idx_worst, idx_median, idx_volatile)
+
+def _sim_main(
+    rng: np.random.Generator,
     initial_portfolio: float,
     annual_contribution: float,
     years: int,
     expected_return_mean: float,
     expected_return_std: float,
-    iterations: int = 1000,
-    time_unit: str = 'month'
+    iterations: int
 ):
     # Main Simulation (Long-term, Monthly steps)
     # We keep the main simulation monthly for consistency in the Fan Chart
@@ -134,12 +293,9 @@ def run_monte_carlo_simulation(
     monthly_contribution = annual_contribution / 12
     
     total_months = years * 12
-    simulations = np.zeros((iterations, total_months + 1))
-    simulations[:, 0] = initial_portfolio
-    
-    for t in range(1, total_months + 1):
-        random_shocks = np.random.normal(monthly_return_mean, monthly_return_std, iterations)
-        simulations[:, t] = simulations[:, t-1] * (1 + random_shocks) + monthly_contribution
+    simulations = _simulate_paths(
+        rng, initial_portfolio, monthly_contribution, monthly_return_mean, monthly_return_std, total_months, iterations
+    )
 
     # Extract year-end values for the main chart
     year_indices = np.arange(0, total_months + 1, 12)
@@ -152,61 +308,45 @@ def run_monte_carlo_simulation(
     p75 = np.percentile(year_simulations, 75, axis=0)
     p95 = np.percentile(year_simulations, 95, axis=0)
 
+    return {
+        "p5": p5.astype(np.float64).tolist(),
+        "p25": p25.astype(np.float64).tolist(),
+        "p50": p50.astype(np.float64).tolist(),
+        "p75": p75.astype(np.float64).tolist(),
+        "p95": p95.astype(np.float64).tolist(),
+    }
+
+def _sim_short_term(
+    rng: np.random.Generator,
+    initial_portfolio: float,
+    annual_contribution: float,
+    expected_return_mean: float,
+    expected_return_std: float,
+    time_unit: str
+):
     # Short-term Volatility Simulation (Year 1 only, Scenario-based)
-    short_term_paths = []
-    if time_unit in ['day', 'month']:
-        st_steps = 252 if time_unit == 'day' else 12
-        st_dt = 1 / st_steps
-        st_mean = expected_return_mean * st_dt
-        st_std = expected_return_std * np.sqrt(st_dt)
-        st_contribution = annual_contribution / st_steps
-        
-        # Run 1000 iterations for short-term to find representative paths
-        st_iterations = 1000
-        st_sims = np.zeros((st_iterations, st_steps + 1))
-        st_sims[:, 0] = initial_portfolio
-        
-        for t in range(1, st_steps + 1):
-            shocks = np.random.normal(st_mean, st_std, st_iterations)
-            st_sims[:, t] = st_sims[:, t-1] * (1 + shocks) + st_contribution
+    if time_unit not in ['day', 'month']:
+        return []
 
-        # Find indices for specific scenarios
-        final_values = st_sims[:, -1]
-        
-        # 1. Best Case (approx P95)
-        target_p95 = np.percentile(final_values, 95)
-        idx_best = (np.abs(final_values - target_p95)).argmin()
-        
-        # 2. Worst Case (approx P5)
-        target_p5 = np.percentile(final_values, 5)
-        idx_worst = (np.abs(final_values - target_p5)).argmin()
-        
-        # 3. Median Case (approx P50)
-        target_p50 = np.percentile(final_values, 50)
-        idx_median = (np.abs(final_values - target_p50)).argmin()
-        
-        # 4. High Volatility (Max Std Dev of returns)
-        # Calculate returns for each path: (Pt - Pt-1) / Pt-1
-        # This is approximate, but good enough for visual selection
-        # Or simply use the path with highest standard deviation of prices if returns are constant mean
-        # Better: Calculate std dev of daily/monthly returns for each path
-        returns = (st_sims[:, 1:] - st_sims[:, :-1]) / st_sims[:, :-1]
-        path_volatilities = np.std(returns, axis=1)
-        idx_volatile = np.argmax(path_volatilities)
-
-        # Format for frontend
-        for i in range(st_steps + 1):
-            point = {
-                "step": i,
-                "best": st_sims[idx_best, i],
-                "worst": st_sims[idx_worst, i],
-                "median": st_sims[idx_median, i],
-                "volatile": st_sims[idx_volatile, i]
-            }
-            short_term_paths.append(point)
+    st_steps = 252 if time_unit == 'day' else 12
+    st_dt = 1 / st_steps
+    st_mean = expected_return_mean * st_dt
+    st_std = expected_return_std * np.sqrt(st_dt)
+    st_contribution = annual_contribution / st_steps
+    
+    # Run 1000 iterations for short-term to find representative paths
+    st_iterations = 1000
+    st_sims = _simulate_paths(rng, initial_portfolio, st_contribution, st_mean, st_std, st_steps, st_iterations)
+    return _select_scenario_paths(st_sims)
 
+def _sim_one_month(
+    rng: np.random.Generator,
+    initial_portfolio: float,
+    annual_contribution: float,
+    expected_return_mean: float,
+    expected_return_std: float
+):
     # One Month Daily Variation (Always 21 trading days)
-    one_month_paths = []
     om_steps = 21
     om_dt = 1 / 252 # Daily step size assuming 252 trading days
     om_mean = expected_return_mean * om_dt
@@ -214,46 +354,42 @@ def run_monte_carlo_simulation(
     om_contribution = annual_contribution / 252 # Daily contribution
     
     om_iterations = 1000
-    om_sims = np.zeros((om_iterations, om_steps + 1))
-    om_sims[:, 0] = initial_portfolio
-    
-    for t in range(1, om_steps + 1):
-        shocks = np.random.normal(om_mean, om_std, om_iterations)
-        om_sims[:, t] = om_sims[:, t-1] * (1 + shocks) + om_contribution
+    om_sims = _simulate_paths(rng, initial_portfolio, om_contribution, om_mean, om_std, om_steps, om_iterations)
+    return _select_scenario_paths(om_sims)
 
-    # Find indices for specific scenarios (One Month)
-    om_final_values = om_sims[:, -1]
-    
-    om_target_p95 = np.percentile(om_final_values, 95)
-    om_idx_best = (np.abs(om_final_values - om_target_p95)).argmin()
-    
-    om_target_p5 = np.percentile(om_final_values, 5)
-    om_idx_worst = (np.abs(om_final_values - om_target_p5)).argmin()
-    
-    om_target_p50 = np.percentile(om_final_values, 50)
-    om_idx_median = (np.abs(om_final_values - om_target_p50)).argmin()
+def run_monte_carlo_simulation(
+    initial_portfolio: float,
+    annual_contribution: float,
+    years: int,
+    expected_return_mean: float,
+    expected_return_std: float,
+    iterations: int = 1000,
+    time_unit: str = 'month',
+    seed: Optional[int] = None
+):
+    # Use a dedicated generator when a seed is given so results are reproducible
+    rng = np.random.default_rng(seed) if seed is not None else _RNG
     
-    om_returns = (om_sims[:, 1:] - om_sims[:, :-1]) / om_sims[:, :-1]
-    om_path_volatilities = np.std(om_returns, axis=1)
-    om_idx_volatile = np.argmax(om_path_volatilities)
-
-    for i in range(om_steps + 1):
-        point = {
-            "step": i,
-            "best": om_sims[om_idx_best, i],
-            "worst": om_sims[om_idx_worst, i],
-            "median": om_sims[om_idx_median, i],
-            "volatile": om_sims[om_idx_volatile, i]
-        }
-        one_month_paths.append(point)
+    # Each simulation draws from its own child generator, so results do not depend on call order
+    with rng.bit_generator.lock:
+        main_rng, st_rng, om_rng = rng.spawn(3)
+
+    main_result = _sim_main(
+        main_rng, initial_portfolio, annual_contribution, years,
+        expected_return_mean, expected_return_std, iterations
+    )
+    short_term_paths = _sim_short_term(
+        st_rng, initial_portfolio, annual_contribution,
+        expected_return_mean, expected_return_std, time_unit
+    )
+    one_month_paths = _sim_one_month(
+        om_rng, initial_portfolio, annual_contribution,
+        expected_return_mean, expected_return_std
+    )
 
     return {
         "years": list(range(years + 1)),
-        "p5": p5.tolist(),
-        "p25": p25.tolist(),
-        "p50": p50.tolist(),
-        "p75": p75.tolist(),
-        "p95": p95.tolist(),
+        **main_result,
         "short_term_paths": short_term_paths,
         "one_month_paths": one_month_paths,
         "metrics": {
@@ -262,6 +398,39 @@ def run_monte_carlo_simulation(
         }
     }
 
+# Daily history barely changes intraday; keyed by (tickers, start date) so it rolls over daily
+_HIST_CACHE = TTLCache(maxsize=64, ttl=3600)
+_HIST_LOCK = threading.Lock()
+
+@cached(cache=_HIST_CACHE, lock=_HIST_LOCK)
+def _fetch_hist(tickers: Tuple[str, ...], start_date: str) -> pd.DataFrame:
+    """
+    Downloads adjusted daily close prices. Raises LookupError (which is not cached) if no data is returned.
+    The cached DataFrame is shared between callers and must not be modified in place.
+    """
+    # Use auto_adjust=True to get adjusted close (accounting for dividends/splits)
+    # progress=False to suppress stdout
+    hist_data = yf.download(list(tickers), start=start_date, auto_adjust=True, progress=False)['Close']
+    if hist_data.empty:
+        raise LookupError(f"No historical data for {tickers}")
+    return hist_data
+
+def purge_caches() -> Dict[str, int]:
+    """
+    Drops every cached price, FX rate and price history entry.
+    Returns how many entries were removed from each cache.
+    """
+    purged = {}
+    for name, cache, lock in (
+        ("prices", _PRICE_CACHE, _PRICE_LOCK),
+        ("fx", _FX_CACHE, _FX_LOCK),
+        ("history", _HIST_CACHE, _HIST_LOCK),
+    ):
+        with lock:
+            purged[name] = len(cache)
+            cache.clear()
+    return purged
+
 def run_historical_backtest(
     assets: List[any], 
     initial_portfolio_value: float, 
@@ -274,41 +443,12 @@ def run_historical_backtest(
     Compares against a Real Estate benchmark (VNQ or custom).
     """
     # 1. Calculate Weights
-    total_value = sum(asset.value for asset in assets)
+    classes, values = _classify(assets)
+    total_value = values.sum()
     if total_value == 0:
         return {"dates": [], "portfolio": [], "real_estate": []}
 
-    weights = {
-        "cash": 0.0,
-        "tw_stock": 0.0,
-        "us_stock": 0.0,
-        "bond": 0.0,
-        "gold": 0.0,
-        "real_estate": 0.0
-    }
-
-    for asset in assets:
-        weight = asset.value / total_value
-        category = asset.category
-        name = asset.name.lower()
-        ticker = asset.ticker
-        
-        asset_class = "us_stock" # Default
-        if category == "Cash/Bank Deposit":
-            asset_class = "cash"
-        elif category == "Stock/Fund":
-            if ticker and (ticker.endswith(".TW") or ticker.endswith(".TWO")):
-                asset_class = "tw_stock"
-            else:
-                asset_class = "us_stock"
-        elif category == "Bond" or category == "Insurance":
-            asset_class = "bond"
-        elif category == "Real Estate":
-            asset_class = "real_estate"
-        elif "gold" in name or "黃金" in name:
-            asset_class = "gold"
-        
-        weights[asset_class] += weight
+    weights = dict(zip(_CLASS_ORDER, _class_weights(classes, values, total_value)))
 
     # 2. Fetch Historical Data
     tickers = {
@@ -329,12 +469,8 @@ def run_historical_backtest(
         # Fetch slightly more than 'years' to ensure we have a start point
         start_date = (pd.Timestamp.now() - pd.DateOffset(years=years)).strftime('%Y-%m-%d')
         
-        # Use auto_adjust=True to get adjusted close (accounting for dividends/splits)
-        # progress=False to suppress stdout
-        hist_data = yf.download(download_tickers, start=start_date, auto_adjust=True, progress=False)['Close']
-        
-        if hist_data.empty:
-             return {"dates": [], "portfolio": [], "real_estate": []}
+        # Sorted tuple so the cache key does not depend on ticker order
+        hist_data = _fetch_hist(tuple(sorted(set(download_tickers))), start_date)
              
         # Fill missing data (forward fill then backward fill)
         hist_data = hist_data.ffill().bfill()
@@ -344,6 +480,8 @@ def run_historical_backtest(
         # For 10 years, ~2500 points. Recharts can handle it, but maybe weekly is better?
         # Let's stick to daily for accuracy, frontend can handle 2500 points usually.
         
+    except LookupError:
+        return {"dates": [], "portfolio": [], "real_estate": []}
     except Exception as e:
         print(f"Error fetching backtest data: {e}")
         return {"dates": [], "portfolio": [], "real_estate": []}
@@ -355,22 +493,20 @@ def run_historical_backtest(
     # Create Cash series (2% annual return)
     days = len(hist_data)
     daily_cash_return = 1.02 ** (1/252)
-    cash_series = [daily_cash_return ** i for i in range(days)]
+    cash_series = np.power(daily_cash_return, np.arange(days))
     
-    portfolio_series = np.zeros(days)
+    # Only held classes take part, so an all-NaN column for an unheld ticker cannot poison the sum.
+    # Weight of classes whose ticker is missing is treated as cash for safety
+    held = [k for k in tickers if weights[k] > 0]
+    classes_order = [k for k in held if tickers[k] in normalized_data.columns]
+    cash_weight = weights["cash"] + sum(weights[k] for k in held if k not in classes_order)
     
-    # Add weighted components
-    if weights["cash"] > 0:
-        portfolio_series += weights["cash"] * np.array(cash_series)
-        
-    for asset_class, ticker in tickers.items():
-        if weights[asset_class] > 0:
-            if ticker in normalized_data.columns:
-                portfolio_series += weights[asset_class] * normalized_data[ticker].values
-            else:
-                # Fallback if ticker missing? Treat as cash or ignore?
-                # Treat as cash for safety
-                portfolio_series += weights[asset_class] * np.array(cash_series)
+    # Weighted sum of all components as one (days x classes) @ (classes,) product
+    class_prices = normalized_data[[tickers[k] for k in classes_order]].values
+    class_weights = np.array([weights[k] for k in classes_order])
+    portfolio_series = class_prices @ class_weights
+    if cash_weight > 0:
+        portfolio_series += cash_weight * cash_series
 
     # Scale by initial portfolio value
     portfolio_values = portfolio_series * initial_portfolio_value
@@ -391,26 +527,25 @@ def run_historical_backtest(
     # Map tickers back to asset classes for the output
     ticker_to_class = {v: k for k, v in tickers.items()}
     
-    for ticker in hist_data.columns:
+    # Compute CAGR and volatility for all tickers in one pass over the price matrix
+    prices = hist_data.values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        start_vals = prices[0]
+        cagrs = np.where(start_vals > 0, np.power(prices[-1] / start_vals, 1.0 / years) - 1, 0.0)
+        
+        # Volatility (Annualized std of daily log returns)
+        log_returns = np.log(prices[1:] / prices[:-1])
+        # An all-NaN column (ticker without data) yields NaN, as pandas .std() did;
+        # errstate does not cover nanstd's degrees-of-freedom warning, so silence it here
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            volatilities = np.nanstd(log_returns, axis=0, ddof=1) * np.sqrt(252)
+    
+    for ticker, cagr, volatility in zip(hist_data.columns, cagrs, volatilities):
         if ticker not in ticker_to_class:
             continue
             
-        asset_class = ticker_to_class[ticker]
-        series = hist_data[ticker]
-        
-        # CAGR
-        start_val = series.iloc[0]
-        end_val = series.iloc[-1]
-        if start_val > 0:
-            cagr = (end_val / start_val) ** (1 / years) - 1
-        else:
-            cagr = 0.0
-            
-        # Volatility (Annualized std of daily log returns)
-        daily_returns = np.log(series / series.shift(1)).dropna()
-        volatility = daily_returns.std() * np.sqrt(252)
-        
-        historical_metrics[asset_class] = {
+        historical_metrics[ticker_to_class[ticker]] = {
             "return": float(cagr),
             "volatility": float(volatility)
         }
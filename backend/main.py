@@ -1,12 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import models, database
-from routers import auth, finance, simulation
+from sqlalchemy import text
+from . import models, database
+from .routers import admin, auth, finance, simulation
 
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables
+    async with database.engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        # create_all skips indexes on existing tables; the linked-expense upsert needs this one.
+        # Fails at startup if duplicate linked expenses exist (update_db.py removes them)
+        await conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_expenses_liability_id ON expenses (liability_id)"))
+    yield
+    await database.engine.dispose()
 
-app = FastAPI(title="WealthMap API")
+app = FastAPI(title="WealthMap API", lifespan=lifespan)
 
 # CORS Configuration
 origins = ["*"]
@@ -22,6 +32,7 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(finance.router, prefix="/api/v1/finance", tags=["finance"])
 app.include_router(simulation.router, prefix="/api/v1/simulation", tags=["simulation"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
 @app.get("/")
 def read_root():
@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, JSON
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Float, DateTime, JSON
 from sqlalchemy.orm import relationship
-from database import Base
+from .database import Base
 from datetime import datetime, date
 
 class User(Base):
@@ -15,9 +15,12 @@ class User(Base):
     liabilities = relationship("Liability", back_populates="owner")
     incomes = relationship("Income", back_populates="owner")
     expenses = relationship("Expense", back_populates="owner")
+    future_goals = relationship("FutureGoalExpense", back_populates="owner")
 
 class Asset(Base):
     __tablename__ = "assets"
+    # (owner_id, id) serves both "all rows of an owner" and "row by id for an owner" lookups
+    __table_args__ = (Index("ix_assets_owner_id_id", "owner_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -33,12 +36,12 @@ class Asset(Base):
 
 class Liability(Base):
     __tablename__ = "liabilities"
+    __table_args__ = (Index("ix_liabilities_owner_id_id", "owner_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     category = Column(String) # Mortgage, Car Loan, Credit Card, Student Loan, Other
     amount = Column(Float)
-    amount = Column(Float)
     interest_rate = Column(Float, nullable=True)
     start_date = Column(DateTime, nullable=True)
     years = Column(Integer, nullable=True)
@@ -49,6 +52,7 @@ class Liability(Base):
 
 class Income(Base):
     __tablename__ = "incomes"
+    __table_args__ = (Index("ix_incomes_owner_id_id", "owner_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     source = Column(String)
@@ -59,17 +63,19 @@ class Income(Base):
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (Index("ix_expenses_owner_id_id", "owner_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     category = Column(String)
     amount = Column(Float) # Monthly amount
-    liability_id = Column(Integer, ForeignKey("liabilities.id"), nullable=True)
+    liability_id = Column(Integer, ForeignKey("liabilities.id"), nullable=True, unique=True, index=True)
     
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="expenses")
 
 class FutureGoalExpense(Base):
     __tablename__ = "future_goals"
+    __table_args__ = (Index("ix_future_goals_owner_id_id", "owner_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -80,5 +86,3 @@ class FutureGoalExpense(Base):
     
     owner_id = Column(Integer, ForeignKey("users.id"))
     owner = relationship("User", back_populates="future_goals")
-
-User.future_goals = relationship("FutureGoalExpense", back_populates="owner")
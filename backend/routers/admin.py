@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from .. import auth, engine
+
+router = APIRouter(
+    tags=["admin"],
+)
+
+@router.post("/cache/purge")
+def purge_cache(user_id: int = Depends(auth.get_current_user_id)):
+    # Forces the next price, FX and history lookups to hit yfinance again
+    return {"purged": engine.purge_caches()}
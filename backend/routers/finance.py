@@ -1,8 +1,13 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime
-import models, schemas, database, auth, engine
+from .. import models, schemas, database, auth, engine
 
 router = APIRouter(
     tags=["finance"],
@@ -11,10 +16,12 @@ router = APIRouter(
 # ... (Assets endpoints remain unchanged) ...
 
 # Helper to calculate payment and update linked expense
-def update_linked_expense(db: Session, liability: models.Liability, user_id: int):
+async def update_linked_expense(db: AsyncSession, liability: models.Liability, user_id: int):
+    # Writes into the caller's transaction; the caller commits
     if not liability.years or liability.years <= 0:
         return
 
+    now = datetime.now()
     principal = liability.amount
     annual_rate = liability.interest_rate or 0
     grace_months = liability.grace_period_months or 0
@@ -26,7 +33,6 @@ def update_linked_expense(db: Session, liability: models.Liability, user_id: int
     # Check if in grace period
     in_grace_period = False
     if start_date and grace_months > 0:
-        now = datetime.now()
         # Calculate months elapsed
         months_elapsed = (now.year - start_date.year) * 12 + (now.month - start_date.month)
         if months_elapsed < grace_months:
@@ -55,81 +61,94 @@ def update_linked_expense(db: Session, liability: models.Liability, user_id: int
             monthly_payment = principal / amortization_months
         else:
             r = annual_rate / 100 / 12
-            monthly_payment = principal * (r * (1 + r)**amortization_months) / ((1 + r)**amortization_months - 1)
+            c = (1.0 + r) ** amortization_months
+            monthly_payment = principal * r * c / (c - 1.0)
 
-    # Update or Create Expense
-    db_expense = db.query(models.Expense).filter(models.Expense.liability_id == liability.id).first()
-    
+    # Update or Create Expense in one statement (relies on the unique index on expenses.liability_id)
     category_name = f"Debt Repayment: {liability.name}{category_suffix}"
-    
-    if db_expense:
-        db_expense.amount = round(monthly_payment, 2)
-        db_expense.category = category_name
-    else:
-        db_expense = models.Expense(
-            category=category_name,
-            amount=round(monthly_payment, 2),
-            owner_id=user_id,
-            liability_id=liability.id
-        )
-        db.add(db_expense)
-    
-    db.commit()
+    amount = round(monthly_payment, 2)
+
+    insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(models.Expense).values(
+        category=category_name,
+        amount=amount,
+        owner_id=user_id,
+        liability_id=liability.id
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Expense.liability_id],
+        set_={"amount": amount, "category": category_name}
+    )
+    await db.execute(stmt)
 
 # Assets
 @router.post("/assets", response_model=schemas.Asset)
-def create_asset(asset: schemas.AssetCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def create_asset(asset: schemas.AssetCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     # If ticker is provided, fetch current price and calculate value
     if asset.ticker and asset.shares:
-        price, rate = engine.get_stock_price_and_rate(asset.ticker)
+        price, rate = await run_in_threadpool(engine.get_stock_price_and_rate, asset.ticker)
         if price:
             asset.value = float(price * asset.shares * rate)
     
     db_asset = models.Asset(**asset.dict(), owner_id=current_user.id)
     db.add(db_asset)
-    db.commit()
-    db.refresh(db_asset)
+    await db.commit()
+    await db.refresh(db_asset)
     return db_asset
 
 @router.put("/assets/{asset_id}", response_model=schemas.Asset)
-def update_asset(asset_id: int, asset: schemas.AssetCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_asset = db.query(models.Asset).filter(models.Asset.id == asset_id, models.Asset.owner_id == current_user.id).first()
+async def update_asset(asset_id: int, asset: schemas.AssetCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_asset = (await db.execute(select(models.Asset).where(models.Asset.id == asset_id, models.Asset.owner_id == current_user.id))).scalars().first()
     if not db_asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
     # If ticker is provided and changed, or if shares changed, re-calculate value
     if asset.category == "Stock/Fund" and asset.ticker and asset.shares:
         # Check if ticker or shares changed, or if we just want to refresh value
-        price, rate = engine.get_stock_price_and_rate(asset.ticker)
+        price, rate = await run_in_threadpool(engine.get_stock_price_and_rate, asset.ticker)
         if price:
             asset.value = float(price * asset.shares * rate)
     
     for key, value in asset.dict().items():
         setattr(db_asset, key, value)
 
-    db.commit()
-    db.refresh(db_asset)
-    db.refresh(db_asset)
+    await db.commit()
+    await db.refresh(db_asset)
     return db_asset
 
 @router.delete("/assets/{asset_id}")
-def delete_asset(asset_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    asset = db.query(models.Asset).filter(models.Asset.id == asset_id, models.Asset.owner_id == current_user.id).first()
+async def delete_asset(asset_id: int, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    asset = (await db.execute(select(models.Asset).where(models.Asset.id == asset_id, models.Asset.owner_id == current_user.id))).scalars().first()
     if not asset:
         raise HTTPException(status_code=404, detail="Asset not found")
     
-    db.delete(asset)
-    db.commit()
+    await db.delete(asset)
+    await db.commit()
     return {"message": "Asset deleted"}
 
 @router.get("/assets", response_model=List[schemas.Asset])
-def read_assets(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    assets = db.query(models.Asset).filter(models.Asset.owner_id == current_user.id).offset(skip).limit(limit).all()
+async def read_assets(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    assets = (await db.execute(select(models.Asset).where(models.Asset.owner_id == current_user.id).offset(skip).limit(limit))).scalars().all()
+    return assets
+
+@router.post("/assets/refresh", response_model=List[schemas.Asset])
+async def refresh_asset_prices(db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    # Re-price all stock holdings with a single batched quote request
+    assets = (await db.execute(select(models.Asset).where(models.Asset.owner_id == current_user.id))).scalars().all()
+    stock_assets = [a for a in assets if a.category == "Stock/Fund" and a.ticker and a.shares]
+    
+    quotes = await run_in_threadpool(engine.get_prices_and_rate, [a.ticker for a in stock_assets])
+    for db_asset in stock_assets:
+        price, rate = quotes[db_asset.ticker]
+        if price:
+            db_asset.value = float(price * db_asset.shares * rate)
+    
+    await db.commit()
     return assets
 
 @router.get("/stock/preview", response_model=schemas.StockPreviewResponse)
-def preview_stock(ticker: str, shares: float, current_user: models.User = Depends(auth.get_current_user)):
-    price, rate = engine.get_stock_price_and_rate(ticker)
+async def preview_stock(ticker: str, shares: float, current_user: models.User = Depends(auth.get_current_user)):
+    price, rate = await run_in_threadpool(engine.get_stock_price_and_rate, ticker)
     if price == 0:
         raise HTTPException(status_code=404, detail="Stock not found")
     
@@ -146,79 +165,80 @@ def preview_stock(ticker: str, shares: float, current_user: models.User = Depend
 
 # Liabilities
 @router.post("/liabilities", response_model=schemas.Liability)
-def create_liability(liability: schemas.LiabilityCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def create_liability(liability: schemas.LiabilityCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     db_liability = models.Liability(**liability.dict(), owner_id=current_user.id)
     db.add(db_liability)
-    db.commit()
-    db.refresh(db_liability)
+    # Assigns db_liability.id without committing, so the expense can reference it
+    await db.flush()
 
     # Calculate Monthly Payment (PMT) with Grace Period Logic
-    update_linked_expense(db, db_liability, current_user.id)
+    await update_linked_expense(db, db_liability, current_user.id)
 
+    await db.commit()
+    await db.refresh(db_liability)
     return db_liability
 
 @router.put("/liabilities/{liability_id}", response_model=schemas.Liability)
-def update_liability(liability_id: int, liability: schemas.LiabilityCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_liability = db.query(models.Liability).filter(models.Liability.id == liability_id, models.Liability.owner_id == current_user.id).first()
+async def update_liability(liability_id: int, liability: schemas.LiabilityCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_liability = (await db.execute(select(models.Liability).where(models.Liability.id == liability_id, models.Liability.owner_id == current_user.id))).scalars().first()
     if not db_liability:
         raise HTTPException(status_code=404, detail="Liability not found")
     
     # Update fields
     for key, value in liability.dict().items():
         setattr(db_liability, key, value)
-    
-    db.commit()
-    db.refresh(db_liability)
 
     # Recalculate Monthly Payment (PMT) with Grace Period Logic
-    update_linked_expense(db, db_liability, current_user.id)
+    await update_linked_expense(db, db_liability, current_user.id)
 
+    await db.commit()
+    await db.refresh(db_liability)
     return db_liability
 
 @router.delete("/liabilities/{liability_id}")
-def delete_liability(liability_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    liability = db.query(models.Liability).filter(models.Liability.id == liability_id, models.Liability.owner_id == current_user.id).first()
+async def delete_liability(liability_id: int, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    liability = (await db.execute(select(models.Liability).where(models.Liability.id == liability_id, models.Liability.owner_id == current_user.id))).scalars().first()
     if not liability:
         raise HTTPException(status_code=404, detail="Liability not found")
     
     # Delete linked expense if exists
-    db.query(models.Expense).filter(models.Expense.liability_id == liability_id).delete()
+    await db.execute(delete(models.Expense).where(models.Expense.liability_id == liability_id))
     
-    db.delete(liability)
-    db.commit()
+    await db.delete(liability)
+    await db.commit()
     return {"message": "Liability deleted"}
 
 @router.get("/liabilities", response_model=List[schemas.Liability])
-def read_liabilities(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    liabilities = db.query(models.Liability).filter(models.Liability.owner_id == current_user.id).offset(skip).limit(limit).all()
+async def read_liabilities(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    liabilities = (await db.execute(select(models.Liability).where(models.Liability.owner_id == current_user.id).offset(skip).limit(limit))).scalars().all()
     return liabilities
 
 # Income
 @router.post("/incomes", response_model=schemas.Income)
-def create_income(income: schemas.IncomeCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def create_income(income: schemas.IncomeCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     db_income = models.Income(**income.dict(), owner_id=current_user.id)
     db.add(db_income)
-    db.commit()
-    db.refresh(db_income)
+    await db.commit()
+    await db.refresh(db_income)
     return db_income
 
 @router.get("/incomes", response_model=List[schemas.Income])
-def read_incomes(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    incomes = db.query(models.Income).filter(models.Income.owner_id == current_user.id).offset(skip).limit(limit).all()
+async def read_incomes(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    incomes = (await db.execute(select(models.Income).where(models.Income.owner_id == current_user.id).offset(skip).limit(limit))).scalars().all()
     return incomes
 
 # Expenses
 @router.post("/expenses", response_model=schemas.Expense)
-def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def create_expense(expense: schemas.ExpenseCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     db_expense = models.Expense(**expense.dict(), owner_id=current_user.id)
     db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
+    await db.commit()
+    await db.refresh(db_expense)
     return db_expense
 
 @router.get("/expenses", response_model=List[schemas.Expense])
-def read_expenses(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    expenses = db.query(models.Expense).filter(models.Expense.owner_id == current_user.id).offset(skip).limit(limit).all()
+async def read_expenses(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    expenses = (await db.execute(select(models.Expense).where(models.Expense.owner_id == current_user.id).offset(skip).limit(limit))).scalars().all()
     return expenses
 
 # Future Goals
@@ -227,7 +247,7 @@ import urllib.parse
 # ...
 
 @router.post("/goals", response_model=schemas.FutureGoalExpense)
-def create_goal(goal: schemas.FutureGoalExpenseCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+async def create_goal(goal: schemas.FutureGoalExpenseCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     # Generate AI Image URL
     prompt = f"minimalist flat vector icon of {goal.name}, white background, simple, clean, high quality"
     encoded_prompt = urllib.parse.quote(prompt)
@@ -238,18 +258,18 @@ def create_goal(goal: schemas.FutureGoalExpenseCreate, db: Session = Depends(dat
     db_goal.image_url = image_url # Override/Set image_url
     
     db.add(db_goal)
-    db.commit()
-    db.refresh(db_goal)
+    await db.commit()
+    await db.refresh(db_goal)
     return db_goal
 
 @router.get("/goals", response_model=List[schemas.FutureGoalExpense])
-def read_goals(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    goals = db.query(models.FutureGoalExpense).filter(models.FutureGoalExpense.owner_id == current_user.id).offset(skip).limit(limit).all()
+async def read_goals(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    goals = (await db.execute(select(models.FutureGoalExpense).where(models.FutureGoalExpense.owner_id == current_user.id).offset(skip).limit(limit))).scalars().all()
     return goals
 
 @router.put("/goals/{goal_id}", response_model=schemas.FutureGoalExpense)
-def update_goal(goal_id: int, goal: schemas.FutureGoalExpenseCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_goal = db.query(models.FutureGoalExpense).filter(models.FutureGoalExpense.id == goal_id, models.FutureGoalExpense.owner_id == current_user.id).first()
+async def update_goal(goal_id: int, goal: schemas.FutureGoalExpenseCreate, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_goal = (await db.execute(select(models.FutureGoalExpense).where(models.FutureGoalExpense.id == goal_id, models.FutureGoalExpense.owner_id == current_user.id))).scalars().first()
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
@@ -265,16 +285,40 @@ def update_goal(goal_id: int, goal: schemas.FutureGoalExpenseCreate, db: Session
         if key != 'image_url': # Don't overwrite image_url unless we regenerated it
              setattr(db_goal, key, value)
     
-    db.commit()
-    db.refresh(db_goal)
+    await db.commit()
+    await db.refresh(db_goal)
     return db_goal
 
 @router.delete("/goals/{goal_id}")
-def delete_goal(goal_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    goal = db.query(models.FutureGoalExpense).filter(models.FutureGoalExpense.id == goal_id, models.FutureGoalExpense.owner_id == current_user.id).first()
+async def delete_goal(goal_id: int, db: AsyncSession = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    goal = (await db.execute(select(models.FutureGoalExpense).where(models.FutureGoalExpense.id == goal_id, models.FutureGoalExpense.owner_id == current_user.id))).scalars().first()
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
-    db.delete(goal)
-    db.commit()
+    await db.delete(goal)
+    await db.commit()
     return {"message": "Goal deleted"}
+
+# Dashboard
+async def _read_owned(model, user_id: int, skip: int, limit: int):
+    # Own session per query: a single AsyncSession cannot run statements concurrently
+    async with database.SessionLocal() as db:
+        return (await db.execute(select(model).where(model.owner_id == user_id).offset(skip).limit(limit))).scalars().all()
+
+@router.get("/dashboard", response_model=schemas.Dashboard)
+async def read_dashboard(skip: int = 0, limit: int = 100, user_id: int = Depends(auth.get_current_user_id)):
+    # All five lists in one request, queried concurrently on separate pooled connections
+    assets, liabilities, incomes, expenses, goals = await asyncio.gather(
+        _read_owned(models.Asset, user_id, skip, limit),
+        _read_owned(models.Liability, user_id, skip, limit),
+        _read_owned(models.Income, user_id, skip, limit),
+        _read_owned(models.Expense, user_id, skip, limit),
+        _read_owned(models.FutureGoalExpense, user_id, skip, limit),
+    )
+    return {
+        "assets": assets,
+        "liabilities": liabilities,
+        "incomes": incomes,
+        "expenses": expenses,
+        "goals": goals,
+    }
@@ -1,15 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import numpy as np
-from typing import List
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-import engine, auth, models, database, schemas
+from .. import engine, auth, models, database, schemas, sim_kernels
 
 router = APIRouter(
     tags=["simulation"],
 )
 
+_RNG = np.random.default_rng()
+
+# Only the columns the engine reads; plain rows instead of full ORM objects
+_ASSET_COLUMNS = (models.Asset.name, models.Asset.category, models.Asset.ticker, models.Asset.value)
+
+async def _load_assets(db: AsyncSession, user_id: int):
+    return (await db.execute(select(*_ASSET_COLUMNS).where(models.Asset.owner_id == user_id))).all()
+
 class SimulationRequest(BaseModel):
     initial_portfolio: float
     annual_contribution: float
@@ -19,6 +29,7 @@ class SimulationRequest(BaseModel):
     backtest_years: int = 10
     us_stock_ticker: str = "SPY"
     real_estate_ticker: str = "VNQ"
+    seed: Optional[int] = None
 
 class SimulationResponse(BaseModel):
     years: List[int]
@@ -33,18 +44,14 @@ class SimulationResponse(BaseModel):
     metrics: dict
 
 @router.post("/monte_carlo", response_model=SimulationResponse)
-def run_simulation(request: SimulationRequest, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    # Let's query all assets if no user, or specific user's assets.
-    # For now, let's query all assets to be safe if auth is bypassed/dummy.
-    # OR better: use the assets associated with the current user context.
-    
-    # Check if current_user has id.
-    user_id = current_user.id if hasattr(current_user, 'id') else 1
-    
-    assets = db.query(models.Asset).filter(models.Asset.owner_id == user_id).all()
+async def run_simulation(request: SimulationRequest, db: AsyncSession = Depends(database.get_db), user_id: int = Depends(auth.get_current_user_id)):
+    # Use the assets associated with the current user context.
+    assets = await _load_assets(db, user_id)
     
     # 1. Run Historical Backtest FIRST to get dynamic metrics
-    backtest_result = engine.run_historical_backtest(
+    # Network and NumPy work runs in the threadpool to keep the event loop free
+    backtest_result = await run_in_threadpool(
+        engine.run_historical_backtest,
         assets, 
         request.initial_portfolio, 
         request.backtest_years,
@@ -59,14 +66,16 @@ def run_simulation(request: SimulationRequest, db: Session = Depends(database.ge
     mean_return, volatility, breakdown = engine.calculate_portfolio_metrics(assets, metrics_overrides)
     
     # 3. Run Monte Carlo Simulation with dynamic metrics
-    result = engine.run_monte_carlo_simulation(
+    result = await run_in_threadpool(
+        engine.run_monte_carlo_simulation,
         initial_portfolio=request.initial_portfolio,
         annual_contribution=request.annual_contribution,
         years=request.years,
         expected_return_mean=mean_return,
         expected_return_std=volatility,
         iterations=request.iterations,
-        time_unit=request.time_unit
+        time_unit=request.time_unit,
+        seed=request.seed
     )
     
     # Add breakdown to metrics
@@ -82,15 +91,19 @@ class GoalCheckRequest(BaseModel):
     annual_contribution: float
     years: int
     goals: List[schemas.FutureGoalExpense]
+    seed: Optional[int] = None
 
 @router.post("/goals_check")
-def check_goals(request: GoalCheckRequest, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    user_id = current_user.id if hasattr(current_user, 'id') else 1
-    assets = db.query(models.Asset).filter(models.Asset.owner_id == user_id).all()
+async def check_goals(request: GoalCheckRequest, db: AsyncSession = Depends(database.get_db), user_id: int = Depends(auth.get_current_user_id)):
+    assets = await _load_assets(db, user_id)
     
     # Get metrics
     mean_return, volatility, _ = engine.calculate_portfolio_metrics(assets)
     
+    # The simulation is CPU-bound; run it off the event loop
+    return await run_in_threadpool(_simulate_goals, request, mean_return, volatility)
+
+def _simulate_goals(request: GoalCheckRequest, mean_return: float, volatility: float):
     # Simulation Parameters
     iterations = 1000
     monthly_return_mean = mean_return / 12
@@ -98,85 +111,83 @@ def check_goals(request: GoalCheckRequest, db: Session = Depends(database.get_db
     monthly_contribution = request.annual_contribution / 12
     total_months = request.years * 12
     
-    # Prepare Goals Map (Month Index -> List of Goals)
-    goals_by_month = {}
+    # Target month per goal, as parallel arrays sorted by month for the kernel
     now = datetime.now()
+    targets = np.array(
+        [(goal.target_date.year, goal.target_date.month) for goal in request.goals], dtype=np.int64
+    ).reshape(-1, 2)
+    # Minimum 1 month out, capped at the horizon
+    months = np.clip((targets[:, 0] - now.year) * 12 + (targets[:, 1] - now.month), 1, total_months)
+
+    # A zero-year horizon leaves goals at month 0, which is never simulated; they are left out of the results
+    order = np.flatnonzero(months >= 1)
+    order = order[np.argsort(months[order], kind="stable")]
+    goals = [request.goals[i] for i in order]
+    goal_months = months[order]
+    goal_is_cash_flow = np.array([goal.goal_type == 'cash_flow' for goal in goals], dtype=np.bool_)
     
-    for goal in request.goals:
-        months_until = (goal.target_date.year - now.year) * 12 + (goal.target_date.month - now.month)
-        if months_until < 1: months_until = 1 # Minimum 1 month out
-        if months_until > total_months: months_until = total_months
-        
-        if months_until not in goals_by_month:
-            goals_by_month[months_until] = []
-        goals_by_month[months_until].append(goal)
+    # Constants
+    INFLATION_RATE = 0.03
+    DEBT_INTEREST_RATE = 0.05
+    monthly_debt_rate = DEBT_INTEREST_RATE / 12
+    debt_growth = 1 + monthly_debt_rate
+    
+    # Inflation Adjustment depends only on the goal month, so it is computed once per goal up front
+    adjusted_amounts = np.array([goal.amount for goal in goals], dtype=np.float64)
+    adjusted_amounts *= (1 + INFLATION_RATE) ** (goal_months / 12)
+    # Cash flow goals: safe withdrawal (4% of wealth) must cover the annual need; nothing is deducted
+    goal_thresholds = np.where(goal_is_cash_flow, adjusted_amounts * 12 / 0.04, adjusted_amounts)
+    goal_deductions = np.where(goal_is_cash_flow, 0.0, adjusted_amounts)
     
     # Initialize Simulation
     # simulations[i] represents the current wealth of iteration i
-    current_wealth = np.full(iterations, request.initial_portfolio)
+    # float32 halves memory traffic; ~7 significant digits is ample for wealth projections
+    current_wealth = np.full(iterations, request.initial_portfolio, dtype=np.float32)
     
     goal_results = {}
     
-    # Constants
-    INFLATION_RATE = 0.03
-    DEBT_INTEREST_RATE = 0.05
-    monthly_debt_rate = DEBT_INTEREST_RATE / 12
+    # Nothing after the last goal month is reported, so stop simulating there
+    sim_months = int(goal_months[-1]) if goal_months.size else 0
+    
+    # Draw all market shocks up front, one contiguous row per month, stored as growth factors (1 + r)
+    # Child streams are independent, so concurrent requests never share Generator state
+    if request.seed is not None:
+        rng = np.random.default_rng(request.seed)
+    else:
+        with _RNG.bit_generator.lock:
+            rng = _RNG.spawn(1)[0]
+    market_growth = rng.standard_normal((sim_months, iterations), dtype=np.float32)
+    market_growth *= monthly_return_std
+    market_growth += 1 + monthly_return_mean
+    
+    # Run the month-by-month simulation and goal checks in one compiled loop
+    success_counts, medians = sim_kernels.simulate_goals(
+        current_wealth, market_growth, monthly_contribution, debt_growth,
+        goal_months, goal_thresholds, goal_deductions
+    )
     
-    # Run Simulation Step-by-Step
-    for t in range(1, total_months + 1):
-        # 1. Apply Market Return (for positive wealth) or Debt Interest (for negative wealth)
-        random_shocks = np.random.normal(monthly_return_mean, monthly_return_std, iterations)
-        market_growth = 1 + random_shocks
-        debt_growth = 1 + monthly_debt_rate
+    for goal, adjusted_amount, success_count, median_wealth in zip(goals, adjusted_amounts, success_counts, medians):
+        adjusted_amount = float(adjusted_amount)
+        median_wealth = float(median_wealth)
+        
+        if goal.goal_type == 'cash_flow':
+            # Financial Freedom Check: safe withdrawal (4% of wealth) vs monthly need
+            projected_income = median_wealth * 0.04 / 12
+            progress_ratio = projected_income / adjusted_amount if adjusted_amount > 0 else 1.0
+        else:
+            # Lump Sum Check
+            progress_ratio = median_wealth / adjusted_amount if adjusted_amount > 0 else 1.0
         
-        # Vectorized update: If wealth > 0 use market return, else use debt rate
-        # Note: We assume monthly_contribution is added regardless (reducing debt or increasing wealth)
-        current_wealth = np.where(
-            current_wealth >= 0,
-            current_wealth * market_growth + monthly_contribution,
-            current_wealth * debt_growth + monthly_contribution
-        )
+        probability = (success_count / iterations) * 100
         
-        # 2. Handle Goals in this month
-        if t in goals_by_month:
-            for goal in goals_by_month[t]:
-                # Inflation Adjustment
-                # Calculate years from now to this goal
-                years_until = t / 12
-                inflation_factor = (1 + INFLATION_RATE) ** years_until
-                adjusted_amount = goal.amount * inflation_factor
-                
-                # Calculate Success (Wealth >= Adjusted Amount)
-                median_wealth = float(np.median(current_wealth))
-                
-                if goal.goal_type == 'cash_flow':
-                    # Financial Freedom Check
-                    annual_needed = adjusted_amount * 12
-                    safe_withdrawal = current_wealth * 0.04
-                    
-                    success_count = np.sum(safe_withdrawal >= annual_needed)
-                    
-                    projected_income = median_wealth * 0.04 / 12
-                    progress_ratio = projected_income / adjusted_amount if adjusted_amount > 0 else 1.0
-                    
-                else:
-                    # Lump Sum Check
-                    success_count = np.sum(current_wealth >= adjusted_amount)
-                    progress_ratio = median_wealth / adjusted_amount if adjusted_amount > 0 else 1.0
-                    
-                    # DEDUCT the adjusted amount
-                    current_wealth -= adjusted_amount
-                
-                probability = (success_count / iterations) * 100
-                
-                goal_results[goal.id] = {
-                    "goal_id": goal.id,
-                    "probability": round(probability, 1),
-                    "progress_ratio": round(progress_ratio * 100, 1),
-                    "projected_amount": round(median_wealth, 0),
-                    "status": "On Track" if probability > 80 else ("At Risk" if probability < 50 else "Needs Work"),
-                    "inflation_adjusted_amount": round(adjusted_amount, 0) # Optional: return for UI
-                }
+        goal_results[goal.id] = {
+            "goal_id": goal.id,
+            "probability": round(probability, 1),
+            "progress_ratio": round(progress_ratio * 100, 1),
+            "projected_amount": round(median_wealth, 0),
+            "status": "On Track" if probability > 80 else ("At Risk" if probability < 50 else "Needs Work"),
+            "inflation_adjusted_amount": round(adjusted_amount, 0) # Optional: return for UI
+        }
 
     # Convert results map to list
     results = list(goal_results.values())
@@ -114,3 +114,11 @@ class FutureGoalExpense(FutureGoalExpenseBase):
     owner_id: int
     class Config:
         orm_mode = True
+
+# Dashboard Schemas
+class Dashboard(BaseModel):
+    assets: List[Asset]
+    liabilities: List[Liability]
+    incomes: List[Income]
+    expenses: List[Expense]
+    goals: List[FutureGoalExpense]
@@ -0,0 +1,123 @@
+import numpy as np
+from typing import Tuple
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # Numba is optional; fall back to the NumPy implementation
+    HAS_NUMBA = False
+
+# Goals are passed as parallel arrays sorted by month (stable, so same-month goals keep request order):
+#   goal_months      month index (1..total_months) at which the goal is checked
+#   goal_thresholds  wealth needed for the goal to count as met (inflation-adjusted, 4% rule for cash flow)
+#   goal_deductions  amount withdrawn once the goal is checked (0 for cash flow goals)
+
+if HAS_NUMBA:
+    @njit(fastmath=True, cache=True)
+    def _simulate_goals_numba(
+        current_wealth, market_growth, contribution, debt_growth,
+        goal_months, goal_thresholds, goal_deductions
+    ):
+        iterations = current_wealth.size
+        n_goals = goal_months.size
+        success_counts = np.zeros(n_goals, dtype=np.int64)
+        medians = np.empty(n_goals, dtype=np.float64)
+        sorted_wealth = np.empty_like(current_wealth)
+        mid = iterations // 2
+
+        g = 0
+        for t in range(1, market_growth.shape[0] + 1):
+            row = market_growth[t - 1]
+            for i in range(iterations):
+                w = current_wealth[i]
+                current_wealth[i] = w * (row[i] if w >= 0.0 else debt_growth) + contribution
+
+            if g < n_goals and goal_months[g] == t:
+                # Lump sums shift every path by the same amount, so one sort serves all goals due this month;
+                # `offset` tracks deductions applied so far instead of rewriting the sorted copy
+                sorted_wealth[:] = current_wealth
+                sorted_wealth.sort()
+                if iterations % 2:
+                    median = float(sorted_wealth[mid])
+                else:
+                    median = 0.5 * (float(sorted_wealth[mid - 1]) + float(sorted_wealth[mid]))
+                offset = 0.0
+                while g < n_goals and goal_months[g] == t:
+                    medians[g] = median - offset
+                    success_counts[g] = iterations - np.searchsorted(sorted_wealth, goal_thresholds[g] + offset)
+                    offset += goal_deductions[g]
+                    g += 1
+                if offset != 0.0:
+                    for i in range(iterations):
+                        current_wealth[i] -= offset
+        return success_counts, medians
+
+def _check_goals_in_month(
+    current_wealth, sorted_wealth, g, t, goal_months, goal_thresholds, goal_deductions, success_counts, medians
+):
+    """
+    Records median and success count for every goal due in month `t`, starting at goal index `g`,
+    then withdraws their lump sums. Returns the index of the next pending goal.
+    """
+    np.copyto(sorted_wealth, current_wealth)
+    sorted_wealth.sort()
+    median = float(np.median(sorted_wealth))
+    offset = 0.0
+    while g < goal_months.size and goal_months[g] == t:
+        medians[g] = median - offset
+        success_counts[g] = sorted_wealth.size - np.searchsorted(sorted_wealth, goal_thresholds[g] + offset)
+        offset += goal_deductions[g]
+        g += 1
+    if offset != 0.0:
+        current_wealth -= offset
+    return g
+
+def _simulate_goals_numpy(
+    current_wealth, market_growth, contribution, debt_growth,
+    goal_months, goal_thresholds, goal_deductions
+):
+    n_goals = goal_months.size
+    success_counts = np.zeros(n_goals, dtype=np.int64)
+    medians = np.empty(n_goals, dtype=np.float64)
+
+    # Scratch buffers reused every month so the loop does not allocate
+    mask = np.empty(current_wealth.shape, dtype=np.bool_)
+    growth = np.empty_like(current_wealth)
+    sorted_wealth = np.empty_like(current_wealth)
+
+    g = 0
+    for t in range(1, market_growth.shape[0] + 1):
+        # Market return for positive wealth, debt interest for negative wealth
+        np.greater_equal(current_wealth, 0.0, out=mask)
+        growth.fill(debt_growth)
+        np.copyto(growth, market_growth[t - 1], where=mask)
+        np.multiply(current_wealth, growth, out=current_wealth)
+        np.add(current_wealth, contribution, out=current_wealth)
+
+        if g < n_goals and goal_months[g] == t:
+            g = _check_goals_in_month(
+                current_wealth, sorted_wealth, g, t, goal_months, goal_thresholds, goal_deductions, success_counts, medians
+            )
+    return success_counts, medians
+
+def simulate_goals(
+    current_wealth: np.ndarray,
+    market_growth: np.ndarray,
+    contribution: float,
+    debt_growth: float,
+    goal_months: np.ndarray,
+    goal_thresholds: np.ndarray,
+    goal_deductions: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Steps wealth month by month through `market_growth` (months x iterations growth factors),
+    updating `current_wealth` in place. Returns per-goal (success_counts, median_wealth) in goal order.
+    Every goal month must fall within 1..len(market_growth); goals outside it would never be checked.
+    """
+    if goal_months.size and (goal_months[0] < 1 or goal_months[-1] > market_growth.shape[0]):
+        raise ValueError("goal months must fall within the simulated months")
+    kernel = _simulate_goals_numba if HAS_NUMBA else _simulate_goals_numpy
+    return kernel(
+        current_wealth, market_growth, float(contribution), float(debt_growth),
+        goal_months, goal_thresholds, goal_deductions
+    )
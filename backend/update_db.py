@@ -17,49 +17,35 @@ def add_columns():
             user=DB_USER,
             password=DB_PASSWORD
         )
-        cur = conn.cursor()
-        
-        # Add start_date column
-        try:
-            cur.execute("ALTER TABLE liabilities ADD COLUMN start_date TIMESTAMP;")
-            print("Added start_date column")
-        except psycopg2.errors.DuplicateColumn:
-            print("start_date column already exists")
-            conn.rollback()
-        else:
-            conn.commit()
+        # One transaction: either the whole schema update applies or none of it does
+        with conn:
+            with conn.cursor() as cur:
+                # IF NOT EXISTS (PostgreSQL 9.6+) makes each step idempotent
+                cur.execute("""
+                    ALTER TABLE liabilities
+                        ADD COLUMN IF NOT EXISTS start_date TIMESTAMP,
+                        ADD COLUMN IF NOT EXISTS years INTEGER,
+                        ADD COLUMN IF NOT EXISTS grace_period_months INTEGER DEFAULT 0;
+                """)
+                print("Ensured start_date, years and grace_period_months columns on liabilities")
+
+                cur.execute("ALTER TABLE expenses ADD COLUMN IF NOT EXISTS liability_id INTEGER REFERENCES liabilities(id);")
+                print("Ensured liability_id column on expenses")
 
-        # Add years column
-        try:
-            cur.execute("ALTER TABLE liabilities ADD COLUMN years INTEGER;")
-            print("Added years column")
-        except psycopg2.errors.DuplicateColumn:
-            print("years column already exists")
-            conn.rollback()
-        else:
-            conn.commit()
+                # Each liability has at most one linked expense; the upsert in finance.py relies on this index
+                cur.execute("""
+                    DELETE FROM expenses a USING expenses b
+                    WHERE a.liability_id = b.liability_id AND a.id < b.id;
+                """)
+                cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_expenses_liability_id ON expenses (liability_id);")
+                print("Ensured unique index on expenses.liability_id")
 
-        # Add grace_period_months column
-        try:
-            cur.execute("ALTER TABLE liabilities ADD COLUMN grace_period_months INTEGER DEFAULT 0;")
-            print("Added grace_period_months column")
-        except psycopg2.errors.DuplicateColumn:
-            print("grace_period_months column already exists")
-            conn.rollback()
-        else:
-            conn.commit()
-            
-        # Add liability_id to expenses table
-        try:
-            cur.execute("ALTER TABLE expenses ADD COLUMN liability_id INTEGER REFERENCES liabilities(id);")
-            print("Added liability_id column to expenses")
-        except psycopg2.errors.DuplicateColumn:
-            print("liability_id column already exists")
-            conn.rollback()
-        else:
-            conn.commit()
+                # Composite (owner_id, id) indexes also cover owner_id-only lookups, so the old single-column ones go
+                for table in ("assets", "liabilities", "incomes", "expenses", "future_goals"):
+                    cur.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_owner_id_id ON {table} USING btree (owner_id, id);")
+                    cur.execute(f"DROP INDEX IF EXISTS ix_{table}_owner_id;")
+                print("Ensured (owner_id, id) indexes on per-user tables")
 
-        cur.close()
         conn.close()
         print("Database schema updated successfully.")
         